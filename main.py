@@ -1,8 +1,205 @@
+import hashlib
 import os
-from typing import Optional, Dict, Any
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from decimal import Decimal
+from typing import Callable, Optional, Dict, Any, List, Tuple
 
-from flask import Flask, render_template, request, jsonify, g, session, redirect, url_for
-from werkzeug.security import generate_password_hash, check_password_hash
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
+from flask import Flask, Response, current_app, render_template, request, jsonify, g, session, redirect, url_for, stream_with_context
+from flask.json.provider import JSONProvider
+from werkzeug.security import check_password_hash
+
+import migrate
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+
+# Tuned to stay well under 100ms per hash; parameters live in migrate.password_hasher()
+PH = migrate.password_hasher()
+# Hashing runs on a small dedicated pool: argon2-cffi and hashlib release the GIL, so other
+# request threads keep running, and at most HASH_WORKERS memory-hard hashes are in flight.
+HASH_POOL = ThreadPoolExecutor(max_workers=int(os.environ.get("HASH_WORKERS", "2")))
+
+
+def hash_password(password: str) -> str:
+    return PH.hash(password)
+
+
+def verify_password(stored_hash: Optional[str], password: str) -> Tuple[bool, bool]:
+    """
+    Checks a password against an argon2 hash or a legacy Werkzeug PBKDF2 hash.
+    Returns (valid, needs_rehash) so callers can upgrade legacy hashes on login.
+    """
+    if not stored_hash:
+        return False, False
+    if not stored_hash.startswith("$argon2"):
+        valid = check_password_hash(stored_hash, password)
+        return valid, valid
+    try:
+        PH.verify(stored_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, False
+    return True, PH.check_needs_rehash(stored_hash)
+
+
+SQL_LOGIN_USER = "SELECT id, username, email, password_hash, role, blocked FROM users WHERE username=%s OR email=%s"
+SQL_INSERT_USER = "INSERT INTO users (username, email, password_hash, role) VALUES (%s, %s, %s, %s)"
+SQL_GET_PROFILE = "SELECT id, username, display_name, avatar_url, email FROM users WHERE id=%s"
+SQL_SCHEMA_READY = "SELECT 1 FROM schema_migrations WHERE name=%s"
+# One row per user: their email, the due tasks folded into a digest body and
+# their count (SQL_ALL_REMINDER_DIGESTS does the same for every user, for the batch job).
+# The due_date range (not DATEDIFF) lets idx_tasks_remind range-scan it
+SQL_DUE_REMINDER_DIGEST = (
+    "SELECT (SELECT email FROM users WHERE id=%s) AS email, "
+    "GROUP_CONCAT(CONCAT('- ', text, ' (due ', due_date, ')') ORDER BY due_date, id SEPARATOR '\\n') AS body, COUNT(*) AS n "
+    "FROM tasks WHERE user_id=%s AND remind=1 AND completed=0 AND due_date BETWEEN CURRENT_DATE() AND CURRENT_DATE() + INTERVAL 1 DAY"
+)
+SQL_ALL_REMINDER_DIGESTS = (
+    "SELECT u.email, GROUP_CONCAT(CONCAT('- ', t.text, ' (due ', t.due_date, ')') ORDER BY t.due_date, t.id SEPARATOR '\\n') AS body, "
+    "COUNT(*) AS n FROM users u JOIN tasks t ON t.user_id=u.id "
+    "WHERE u.email IS NOT NULL AND u.email<>'' AND t.remind=1 AND t.completed=0 "
+    "AND t.due_date BETWEEN CURRENT_DATE() AND CURRENT_DATE() + INTERVAL 1 DAY GROUP BY u.id, u.email"
+)
+# Run on every new connection; GROUP_CONCAT otherwise truncates at 1 KB
+SQL_SESSION_INIT = "SET SESSION group_concat_max_len = 1048576"
+SQL_UPDATE_PROFILE = "UPDATE users SET display_name=%s, avatar_url=%s WHERE id=%s"
+SQL_UPDATE_PROFILE_ROLE = "UPDATE users SET display_name=%s, avatar_url=%s, role=%s WHERE id=%s"
+# One fixed text for any subset of fields: each column takes a (changed?, value) pair,
+# in ADMIN_USER_COLUMNS order, and keeps its current value when not changed
+SQL_ADMIN_UPDATE_USER = (
+    "UPDATE users SET display_name=IF(%s, %s, display_name), avatar_url=IF(%s, %s, avatar_url), email=IF(%s, %s, email), "
+    "role=IF(%s, %s, role), blocked=IF(%s, %s, blocked) WHERE id=%s"
+)
+SQL_GET_PASSWORD_HASH = "SELECT password_hash FROM users WHERE id=%s"
+SQL_SET_PASSWORD_HASH = "UPDATE users SET password_hash=%s WHERE id=%s"
+
+SQL_INSERT_TASK = "INSERT INTO tasks (user_id, assigned_to, text, description, category, priority, due_date, remind, completed, position) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+SQL_GET_TASK = "SELECT id, user_id, assigned_to, assigned_username, text, description, category, priority, due_date, completed, position, created_at, updated_at FROM tasks WHERE (user_id=%s OR assigned_to=%s) AND id=%s"
+SQL_DELETE_TASK = "DELETE FROM tasks WHERE (user_id=%s OR assigned_to=%s) AND id=%s"
+SQL_COUNT_COMPLETED = "SELECT COUNT(*) AS cnt FROM tasks WHERE user_id=%s AND completed=1"
+SQL_DELETE_COMPLETED = "DELETE FROM tasks WHERE user_id=%s AND completed=1"
+SQL_ANALYTICS_SUMMARY = (
+    "SELECT COUNT(*) AS total, "
+    "SUM(completed=1 AND DATE(updated_at)=CURRENT_DATE()) AS completed_today, "
+    "SUM(completed=1 AND YEARWEEK(updated_at, 1)=YEARWEEK(CURRENT_DATE(), 1)) AS completed_week, "
+    "SUM(YEARWEEK(created_at, 1)=YEARWEEK(CURRENT_DATE(), 1)) AS added_week "
+    "FROM tasks WHERE user_id=%s"
+)
+
+SQL_TASK_ACCESS = "SELECT user_id, assigned_to FROM tasks WHERE id=%s"
+SQL_LIST_SUBTASKS = "SELECT s.id, s.text, s.completed, s.position, s.created_at, s.updated_at FROM tasks t LEFT JOIN subtasks s ON s.task_id=t.id WHERE t.id=%s AND (t.user_id=%s OR t.assigned_to=%s) ORDER BY s.position, s.id"
+SQL_INSERT_SUBTASK = "INSERT INTO subtasks (task_id, text, completed, position) VALUES (%s, %s, %s, %s)"
+SQL_DELETE_SUBTASK = "DELETE FROM subtasks WHERE id=%s"
+
+# Lookup, authorization and write in one statement; owner or admin only
+SQL_ASSIGN_TASK = (
+    "UPDATE tasks t JOIN users u ON u.username=%s SET t.assigned_to=u.id, t.assigned_username=u.username "
+    "WHERE t.id=%s AND (t.user_id=%s OR %s='admin')"
+)
+SQL_ASSIGN_DIAGNOSE = "SELECT t.user_id, EXISTS(SELECT 1 FROM users WHERE username=%s) AS user_exists FROM tasks t WHERE t.id=%s"
+
+_LIST_TASKS_ORDER = {
+    "position": "ORDER BY t.position, t.id",
+    "due": "ORDER BY t.due_date IS NULL, t.due_date ASC, t.id",
+    "created": "ORDER BY t.created_at DESC",
+}
+# Search modes: no q, FULLTEXT MATCH (normal case), LIKE (q not expressible as a FULLTEXT query)
+_TASKS_SEARCH = {
+    None: "",
+    "fulltext": " AND MATCH(t.text, t.description, t.category) AGAINST (%s IN BOOLEAN MODE)",
+    "like": " AND (t.text LIKE %s OR t.description LIKE %s OR t.category LIKE %s)",
+}
+_USERS_SEARCH = {
+    None: "",
+    "fulltext": " AND MATCH(username, email) AGAINST (%s IN BOOLEAN MODE)",
+    "like": " AND (username LIKE %s OR email LIKE %s)",
+}
+# Fixed query text per (verbose, search, sort) so the server sees a small set of stable statements
+SQL_LIST_TASKS = {
+    (verbose, search, sort): (
+        "SELECT t.id, t.text, t.description, t.category, t.priority, t.due_date, t.remind, t.completed, t.position, t.assigned_username"
+        + (", t.created_at, t.updated_at" if verbose else "")
+        + " FROM tasks t WHERE (t.user_id=%s OR t.assigned_to=%s)"
+        + search_sql
+        + " " + order
+    )
+    for verbose in (False, True)
+    for search, search_sql in _TASKS_SEARCH.items()
+    for sort, order in _LIST_TASKS_ORDER.items()
+}
+
+# The role filter is a parameter ('' = any role) rather than a query variant
+SQL_ADMIN_LIST_USERS = {
+    search: (
+        "SELECT id, username, email, display_name, avatar_url, role, blocked, created_at FROM users WHERE (%s='' OR role=%s)"
+        + search_sql
+        + " ORDER BY created_at DESC"
+    )
+    for search, search_sql in _USERS_SEARCH.items()
+}
+
+# InnoDB only indexes words between innodb_ft_min_token_size (3) and
+# innodb_ft_max_token_size (84) characters, minus its default stopword list
+_FULLTEXT_WORD = re.compile(r"\w{3,84}")
+_FULLTEXT_STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or that the this to "
+    "was what when where who will with und www".split()
+)
+
+
+def search_args(q: str, like_count: int) -> Tuple[Optional[str], list]:
+    """
+    Maps a search string to a search mode and its parameters. Plain words become
+    a BOOLEAN MODE prefix query ("+word*" each) served by the FULLTEXT index;
+    anything else (short, long or stop words, punctuation, operators) falls back to LIKE.
+    """
+    if not q:
+        return None, []
+    words = q.split()
+    if all(_FULLTEXT_WORD.fullmatch(w) and w.lower() not in _FULLTEXT_STOPWORDS for w in words):
+        return "fulltext", [" ".join(f"+{w}*" for w in words)]
+    return "like", [f"%{q}%"] * like_count
+
+
+def _orjson_default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, so jsonify() and streamed rows use its
+    C serializer. MySQL date/datetime values are emitted as ISO 8601.
+    Responses are built from orjson's bytes without a str round trip.
+    """
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Same argument rules as jsonify(): one value, several (as a list), or keywords
+        if args and kwargs:
+            raise TypeError("app.json.response() takes either args or kwargs, not both")
+        if not args and not kwargs:
+            obj = None
+        elif args:
+            obj = args[0] if len(args) == 1 else list(args)
+        else:
+            obj = kwargs
+        return self._app.response_class(self.dumps_bytes(obj), mimetype="application/json")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
 
 def create_app() -> Flask:
@@ -12,15 +209,78 @@ def create_app() -> Flask:
     """
     app = Flask(__name__, template_folder="templates", static_folder="static")
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
 
-    # Attempt to ensure schema on startup (safe: IF NOT EXISTS)
-    try:
-        conn = connect_mysql(True)
-        if conn is not None:
-            ensure_schema(conn)
-            conn.close()
-    except Exception:
-        pass
+    # Server-side sessions in Redis when configured: the cookie only carries a session id
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        try:
+            import redis  # type: ignore
+            from flask_session import Session  # type: ignore
+            app.config.update(
+                SESSION_TYPE="redis",
+                SESSION_REDIS=redis.Redis.from_url(redis_url),
+                SESSION_USE_SIGNER=True,
+                SESSION_PERMANENT=False,
+            )
+            Session(app)
+        except Exception as e:
+            # REDIS_URL was asked for explicitly; say why cookie sessions are in use instead
+            app.logger.warning("REDIS_URL is set but Redis sessions could not be enabled (%s); using signed-cookie sessions", e)
+
+    # Migrations are opt-in at startup so every worker process does not redo them;
+    # run `python migrate.py` (or `flask --app main bootstrap-db`) once per deployment instead
+    if os.environ.get("BOOTSTRAP_DB") == "1":
+        bootstrap_db()
+
+    @app.cli.command("send-reminders")
+    def send_reminders_command():
+        """
+        Emails every user one digest of their reminder-enabled tasks due today or
+        tomorrow (intended for cron). Per-user rows are streamed from an unbuffered
+        cursor and handed to MAIL_POOL workers in batches as they arrive, each batch
+        sent over one SMTP connection.
+        """
+        conn = get_db()
+        if conn is None:
+            print("Database connection failed. Check env and drivers.")
+            return
+        cur = stream_cursor(conn)
+        cur.execute(SQL_ALL_REMINDER_DIGESTS)
+        jobs = []
+        batch: List[Tuple[str, str, str]] = []
+        for it in cur:
+            batch.append(reminder_digest(it["email"], it["body"], int(it["n"])))
+            if len(batch) == REMINDER_BATCH_SIZE:
+                jobs.append((batch, MAIL_POOL.submit(send_emails_bulk, batch)))
+                batch = []
+        cur.close()
+        if batch:
+            jobs.append((batch, MAIL_POOL.submit(send_emails_bulk, batch)))
+        wait([f for _, f in jobs])
+        total = sum(len(b) for b, _ in jobs)
+        sent = sum(len(b) for b, f in jobs if f.exception() is None)
+        print(f"Sent {sent} of {total} reminder email(s).")
+
+    @app.cli.command("bootstrap-db")
+    def bootstrap_db_command():
+        """
+        Creates the database if it is missing and applies pending migrations.
+        """
+        bootstrap_db()
+
+    @app.before_request
+    def load_current_user():
+        """
+        Reads the session once per request into g.current_user for the handlers below.
+        """
+        user_id = session.get("user_id")
+        g.current_user = {
+            "id": int(user_id) if user_id else None,
+            "username": session.get("username"),
+            "role": session.get("role"),
+        }
 
     @app.get("/")
     def login_page():
@@ -34,7 +294,7 @@ def create_app() -> Flask:
         """
         Serves the main todo application page.
         """
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return redirect(url_for("login_page"))
         return render_template("app.html")
 
@@ -61,12 +321,16 @@ def create_app() -> Flask:
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT id, username, email, password_hash, role, blocked FROM users WHERE username=%s OR email=%s", (username, username))
+        cur.execute(SQL_LOGIN_USER, (username, username))
         row = cur.fetchone()
-        if not row or not check_password_hash(row.get("password_hash"), password):
+        valid, needs_rehash = HASH_POOL.submit(verify_password, row.get("password_hash") if row else None, password).result()
+        if not valid:
             return jsonify({"ok": False, "error": "invalid_credentials"}), 401
         if row.get("blocked"):
             return jsonify({"ok": False, "error": "blocked"}), 403
+        if needs_rehash:
+            cur.execute(SQL_SET_PASSWORD_HASH, (HASH_POOL.submit(hash_password, password).result(), row.get("id")))
+            conn.commit()
         session["user_id"] = row.get("id")
         session["username"] = row.get("username")
         session["role"] = row.get("role") or "customer"
@@ -85,9 +349,9 @@ def create_app() -> Flask:
         """
         Returns current session user info.
         """
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False}), 401
-        return jsonify({"ok": True, "user": {"id": session.get("user_id"), "username": session.get("username"), "role": session.get("role", "customer")}})
+        return cached_json({"ok": True, "user": {"id": g.current_user["id"], "username": g.current_user["username"], "role": g.current_user["role"] or "customer"}})
 
     @app.post("/api/auth/register")
     def api_register():
@@ -103,10 +367,11 @@ def create_app() -> Flask:
         cur = conn.cursor()
         try:
             cur.execute(
-                "INSERT INTO users (username, email, password_hash, role) VALUES (%s, %s, %s, %s)",
-                (username, email, generate_password_hash(password), "customer"),
+                SQL_INSERT_USER,
+                (username, email, HASH_POOL.submit(hash_password, password).result(), "customer"),
             )
             conn.commit()
+            bump_version("users")
         except Exception as e:
             return jsonify({"ok": False, "error": "user_exists_or_db_error"}), 400
         return jsonify({"ok": True})
@@ -123,29 +388,23 @@ def create_app() -> Flask:
         """
         Lists tasks. Placeholder response until MySQL integration.
         """
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"])
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
-        cur = conn.cursor()
         sort = request.args.get("sort", "position")
+        if sort not in _LIST_TASKS_ORDER:
+            sort = "position"
         q = (request.args.get("q") or "").strip()
-        order_sql = "ORDER BY position, id"
-        if sort == "due":
-            order_sql = "ORDER BY due_date IS NULL, due_date ASC, id"
-        elif sort == "created":
-            order_sql = "ORDER BY created_at DESC"
-        where_sql = "WHERE (t.user_id=%s OR t.assigned_to=%s)"
-        params = [user_id, user_id]
-        if q:
-            where_sql += " AND (text LIKE %s OR description LIKE %s OR category LIKE %s)"
-            like = f"%{q}%"
-            params.extend([like, like, like])
-        cur.execute(f"SELECT t.id, t.text, t.description, t.category, t.priority, t.due_date, t.remind, t.completed, t.position, t.created_at, t.updated_at, t.assigned_to, au.username AS assigned_username FROM tasks t LEFT JOIN users au ON t.assigned_to=au.id {where_sql} {order_sql}", tuple(params))
-        rows = cur.fetchall() or []
-        return jsonify({"ok": True, "data": rows})
+        verbose = request.args.get("verbose") == "1"
+        search, search_params = search_args(q, 3)
+        params = [user_id, user_id] + search_params
+        cur = stream_cursor(conn, dict_rows=False)
+        limit_sql, limit_params = page_args()
+        cur.execute(SQL_LIST_TASKS[(verbose, search, sort)] + limit_sql, tuple(params + limit_params))
+        return stream_columns(cur)
 
     @app.post("/api/tasks")
     def create_task():
@@ -161,30 +420,30 @@ def create_app() -> Flask:
             priority = "medium"
         due_date = str(payload.get("due_date", "")).strip() or None
         remind = 1 if bool(payload.get("remind", False)) else 0
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         if not text:
             return jsonify({"ok": False, "error": "text_required"}), 400
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("INSERT INTO tasks (user_id, assigned_to, text, description, category, priority, due_date, remind, completed, position) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", (user_id, None, text, description, category, priority, due_date, remind, 0, 0))
+        cur.execute(SQL_INSERT_TASK, (user_id, None, text, description, category, priority, due_date, remind, 0, 0))
         conn.commit()
         task_id = cur.lastrowid if hasattr(cur, 'lastrowid') else None
         return jsonify({"ok": True, "data": {"id": task_id, "text": text, "description": description, "category": category, "priority": priority, "due_date": due_date, "remind": bool(remind), "completed": False}}), 201
 
     @app.get("/api/tasks/<int:task_id>")
     def get_task(task_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT t.id, t.user_id, t.assigned_to, au.username AS assigned_username, t.text, t.description, t.category, t.priority, t.due_date, t.completed, t.position, t.created_at, t.updated_at FROM tasks t LEFT JOIN users au ON t.assigned_to=au.id WHERE (t.user_id=%s OR t.assigned_to=%s) AND t.id=%s", (user_id, user_id, task_id))
+        cur.execute(SQL_GET_TASK, (user_id, user_id, task_id))
         row = cur.fetchone()
         if not row:
             return jsonify({"ok": False, "error": "not_found"}), 404
@@ -192,31 +451,42 @@ def create_app() -> Flask:
 
     @app.get("/api/tasks/<int:task_id>/subtasks")
     def list_subtasks(task_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        # Ensure access: task must belong to user or be assigned to them
-        cur.execute("SELECT user_id, assigned_to FROM tasks WHERE id=%s", (task_id,))
-        task_row = cur.fetchone()
-        if not task_row:
-            return jsonify({"ok": False, "error": "not_found"}), 404
-        owner = task_row.get("user_id") if isinstance(task_row, dict) else task_row[0]
-        assignee = task_row.get("assigned_to") if isinstance(task_row, dict) else None
-        if owner != user_id and assignee != user_id:
-            return jsonify({"ok": False, "error": "forbidden"}), 403
-        cur.execute("SELECT id, text, completed, position, created_at, updated_at FROM subtasks WHERE task_id=%s ORDER BY position, id", (task_id,))
+        # Access check is part of the query: task must belong to user or be assigned to them
+        cur.execute(SQL_LIST_SUBTASKS, (task_id, user_id, user_id))
         rows = cur.fetchall() or []
-        return jsonify({"ok": True, "data": rows})
+        if not rows:
+            # No task row came back; find out why only on this error path
+            cur.execute(SQL_TASK_ACCESS, (task_id,))
+            if not cur.fetchone():
+                return jsonify({"ok": False, "error": "not_found"}), 404
+            return jsonify({"ok": False, "error": "forbidden"}), 403
+        return jsonify({"ok": True, "data": [r for r in rows if r.get("id") is not None]})
 
     @app.post("/api/tasks/<int:task_id>/subtasks")
     def create_subtask(task_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
+        if isinstance(payload.get("texts"), list):
+            # Bulk import: one multi-row INSERT and one commit for the whole list
+            texts = [str(t).strip() for t in payload["texts"] if str(t).strip()]
+            rows = [(task_id, t, 0, pos) for pos, t in enumerate(texts)]
+            if not rows:
+                return jsonify({"ok": False, "error": "text_required"}), 400
+            conn = get_db()
+            if conn is None:
+                return jsonify({"ok": False, "error": "db_unavailable"}), 503
+            cur = conn.cursor()
+            cur.executemany(SQL_INSERT_SUBTASK, rows)
+            conn.commit()
+            return jsonify({"ok": True, "created": len(rows)}), 201
         text = str(payload.get("text", "")).strip()
         if not text:
             return jsonify({"ok": False, "error": "text_required"}), 400
@@ -224,14 +494,14 @@ def create_app() -> Flask:
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("INSERT INTO subtasks (task_id, text, completed, position) VALUES (%s, %s, %s, %s)", (task_id, text, 0, 0))
+        cur.execute(SQL_INSERT_SUBTASK, (task_id, text, 0, 0))
         conn.commit()
         sid = cur.lastrowid if hasattr(cur, 'lastrowid') else None
         return jsonify({"ok": True, "data": {"id": sid, "text": text, "completed": False}}), 201
 
     @app.put("/api/subtasks/<int:subtask_id>")
     def update_subtask(subtask_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
         fields = []
@@ -255,22 +525,22 @@ def create_app() -> Flask:
 
     @app.delete("/api/subtasks/<int:subtask_id>")
     def delete_subtask(subtask_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("DELETE FROM subtasks WHERE id=%s", (subtask_id,))
+        cur.execute(SQL_DELETE_SUBTASK, (subtask_id,))
         conn.commit()
         return jsonify({"ok": True})
 
     @app.put("/api/tasks/<int:task_id>")
     def update_task(task_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         fields = []
         params = []
         if "text" in payload:
@@ -313,101 +583,112 @@ def create_app() -> Flask:
 
     @app.delete("/api/tasks/<int:task_id>")
     def delete_task(task_id: int):
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("DELETE FROM tasks WHERE (user_id=%s OR assigned_to=%s) AND id=%s", (user_id, user_id, task_id))
+        cur.execute(SQL_DELETE_TASK, (user_id, user_id, task_id))
         conn.commit()
         return jsonify({"ok": True})
 
     @app.delete("/api/tasks/completed")
     def clear_completed():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) AS cnt FROM tasks WHERE user_id=%s AND completed=1", (user_id,))
-        cnt_row = cur.fetchone() or {"cnt": 0}
-        cur.execute("DELETE FROM tasks WHERE user_id=%s AND completed=1", (user_id,))
+        cur.execute(SQL_COUNT_COMPLETED, (user_id,))
+        deleted = fetch_one(cur, "cnt") or 0
+        cur.execute(SQL_DELETE_COMPLETED, (user_id,))
         conn.commit()
-        return jsonify({"ok": True, "deleted": cnt_row.get("cnt", 0)})
+        return jsonify({"ok": True, "deleted": deleted})
 
     @app.put("/api/tasks/reorder")
     def reorder_tasks():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
         order = payload.get("order") or []
         if not isinstance(order, list) or not order:
             return jsonify({"ok": False, "error": "invalid_order"}), 400
-        user_id = int(session["user_id"]) 
-        conn = get_db()
-        if conn is None:
-            return jsonify({"ok": False, "error": "db_unavailable"}), 503
-        cur = conn.cursor()
+        user_id = g.current_user["id"]
+        positions: Dict[int, int] = {}
         pos = 0
         for task_id in order:
             try:
                 tid = int(task_id)
             except Exception:
                 continue
-            cur.execute("UPDATE tasks SET position=%s WHERE user_id=%s AND id=%s", (pos, user_id, tid))
+            positions[tid] = pos
             pos += 1
+        if not positions:
+            return jsonify({"ok": True})
+        conn = get_db()
+        if conn is None:
+            return jsonify({"ok": False, "error": "db_unavailable"}), 503
+        # One UPDATE for the whole list instead of a round-trip per task
+        cases = " ".join(["WHEN %s THEN %s"] * len(positions))
+        placeholders = ", ".join(["%s"] * len(positions))
+        params = [v for pair in positions.items() for v in pair]
+        params.append(user_id)
+        params.extend(positions.keys())
+        cur = conn.cursor()
+        cur.execute(f"UPDATE tasks SET position = CASE id {cases} END WHERE user_id=%s AND id IN ({placeholders})", tuple(params))
         conn.commit()
         return jsonify({"ok": True})
 
     @app.get("/api/analytics/summary")
     def analytics_summary():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
-        user_id = int(session["user_id"]) 
+        user_id = g.current_user["id"]
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) AS total FROM tasks WHERE user_id=%s", (user_id,))
-        total = (cur.fetchone() or {"total": 0})
-        cur.execute("SELECT COUNT(*) AS completed_today FROM tasks WHERE user_id=%s AND completed=1 AND DATE(updated_at)=CURRENT_DATE()", (user_id,))
-        comp_today = (cur.fetchone() or {"completed_today": 0})
-        cur.execute("SELECT COUNT(*) AS completed_week FROM tasks WHERE user_id=%s AND completed=1 AND YEARWEEK(updated_at, 1)=YEARWEEK(CURRENT_DATE(), 1)", (user_id,))
-        comp_week = (cur.fetchone() or {"completed_week": 0})
-        cur.execute("SELECT COUNT(*) AS added_week FROM tasks WHERE user_id=%s AND YEARWEEK(created_at, 1)=YEARWEEK(CURRENT_DATE(), 1)", (user_id,))
-        added_week = (cur.fetchone() or {"added_week": 0})
-        return jsonify({"ok": True, "data": {"total": total.get('total', 0), "completed_today": comp_today.get('completed_today', 0), "completed_week": comp_week.get('completed_week', 0), "added_week": added_week.get('added_week', 0)}})
+        cur.execute(SQL_ANALYTICS_SUMMARY, (user_id,))
+        row = cur.fetchone() or {}
+        # SUM() yields DECIMAL (or NULL with no rows); normalize to plain ints
+        return cached_json({"ok": True, "data": {k: int(row.get(k) or 0) for k in ("total", "completed_today", "completed_week", "added_week")}})
 
     @app.post("/api/reminders/send")
     def send_due_reminders():
-        if not session.get("user_id"):
+        user = g.current_user
+        if not user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
+        if not smtp_configured(smtp_config()):
+            return jsonify({"ok": False, "error": "smtp_not_configured"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT email FROM users WHERE id=%s", (int(session["user_id"]),))
-        u = cur.fetchone() or {}
-        email = u.get("email") if isinstance(u, dict) else None
-        cur.execute("SELECT text, due_date FROM tasks WHERE user_id=%s AND remind=1 AND completed=0 AND due_date IS NOT NULL AND DATEDIFF(due_date, CURRENT_DATE()) BETWEEN 0 AND 1", (int(session["user_id"]),))
-        items = cur.fetchall() or []
-        try:
-            sent = 0
-            for it in items:
-                if email:
-                    send_email(email, "Task Reminder", f"Reminder: '{it.get('text')}' due {it.get('due_date')}")
-                    sent += 1
-            return jsonify({"ok": True, "sent": sent, "count": len(items)})
-        except Exception:
-            return jsonify({"ok": False, "error": "send_failed"}), 500
+        cur.execute(SQL_DUE_REMINDER_DIGEST, (user["id"], user["id"]))
+        row = cur.fetchone() or {}
+        email = row.get("email")
+        count = int(row.get("n") or 0)
+        queued = bool(email and count)
+        if queued:
+            # One digest email, sent off the request thread
+            logger = current_app.logger
+
+            def log_failure(future: Any) -> None:
+                error = future.exception()
+                if error is not None:
+                    logger.error("Reminder email failed: %s", error)
+
+            MAIL_POOL.submit(send_emails_bulk, [reminder_digest(email, row.get("body"), count)]).add_done_callback(log_failure)
+        return jsonify({"ok": True, "queued": queued, "count": count})
 
     @app.put("/api/tasks/<int:task_id>/assign")
     def assign_task(task_id: int):
-        if not session.get("user_id"):
+        user = g.current_user
+        if not user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
         to_username = str(payload.get("username", "")).strip()
@@ -415,92 +696,129 @@ def create_app() -> Flask:
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT user_id FROM tasks WHERE id=%s", (task_id,))
-        trow = cur.fetchone() or {}
-        owner = trow.get("user_id") if isinstance(trow, dict) else None
-        if owner != int(session["user_id"]) and session.get("role") != "admin":
+        cur.execute(SQL_ASSIGN_TASK, (to_username, task_id, user["id"], user["role"]))
+        if cur.rowcount:
+            conn.commit()
+            return jsonify({"ok": True})
+        # Nothing changed: unknown task or user, a rejected request or a no-op reassignment
+        cur.execute(SQL_ASSIGN_DIAGNOSE, (to_username, task_id))
+        row = cur.fetchone()
+        if not row:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        if row.get("user_id") != user["id"] and user["role"] != "admin":
             return jsonify({"ok": False, "error": "forbidden"}), 403
-        cur.execute("SELECT id FROM users WHERE username=%s", (to_username,))
-        u = cur.fetchone()
-        if not u:
+        if not row.get("user_exists"):
             return jsonify({"ok": False, "error": "user_not_found"}), 404
-        uid = u.get("id") if isinstance(u, dict) else u[0]
-        cur.execute("UPDATE tasks SET assigned_to=%s WHERE id=%s", (uid, task_id))
-        conn.commit()
         return jsonify({"ok": True})
 
     @app.get("/admin/users")
     def admin_users_page():
-        if session.get("role") != "admin":
+        if g.current_user["role"] != "admin":
             return redirect(url_for("login_page"))
         return render_template("admin_users.html")
 
     @app.get("/api/admin/users")
     def admin_list_users():
-        if session.get("role") != "admin":
+        if g.current_user["role"] != "admin":
             return jsonify({"ok": False, "error": "forbidden"}), 403
         q = (request.args.get("q") or "").strip()
         role = (request.args.get("role") or "").strip()
-        conn = get_db()
-        if conn is None:
+        if role not in ("customer", "user", "admin"):
+            role = ""
+        search, search_params = search_args(q, 2)
+        limit_sql, limit_params = page_args()
+        params = tuple([role, role] + search_params + limit_params)
+
+        def fill() -> Optional[bytes]:
+            conn = get_db()
+            if conn is None:
+                return None
+            cur = conn.cursor()
+            cur.execute(SQL_ADMIN_LIST_USERS[search] + limit_sql, params)
+            return json_bytes({"ok": True, "data": cur.fetchall() or []})
+
+        # Keyed on the users version so any write through this app misses at once
+        body = cached_result(("admin_users", TABLE_VERSIONS["users"], search, limit_sql, params), fill)
+        if body is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
-        cur = conn.cursor()
-        where = "WHERE 1=1"
-        params = []
-        if q:
-            where += " AND (username LIKE %s OR email LIKE %s)"; like = f"%{q}%"; params += [like, like]
-        if role in ("customer", "user", "admin"):
-            where += " AND role=%s"; params.append(role)
-        cur.execute(f"SELECT id, username, email, display_name, avatar_url, role, blocked, created_at FROM users {where} ORDER BY created_at DESC", tuple(params))
-        rows = cur.fetchall() or []
-        return jsonify({"ok": True, "data": rows})
+        return Response(body, mimetype="application/json")
 
     @app.put("/api/admin/users/<int:user_id>")
     def admin_update_user(user_id: int):
-        if session.get("role") != "admin":
+        if g.current_user["role"] != "admin":
             return jsonify({"ok": False, "error": "forbidden"}), 403
         payload = request.get_json(silent=True) or {}
-        fields = []
-        params = []
-        if "display_name" in payload:
-            fields.append("display_name=%s"); params.append(str(payload["display_name"]))
-        if "avatar_url" in payload:
-            fields.append("avatar_url=%s"); params.append(str(payload["avatar_url"]))
-        if "email" in payload:
-            fields.append("email=%s"); params.append(str(payload["email"]))
-        if "role" in payload:
-            r = str(payload["role"]).lower()
-            if r not in ("customer", "user", "admin"):
-                return jsonify({"ok": False, "error": "invalid_role"}), 400
-            fields.append("role=%s"); params.append(r)
-        if "blocked" in payload:
-            fields.append("blocked=%s"); params.append(1 if bool(payload["blocked"]) else 0)
+        fields, error = admin_user_fields(payload)
+        if error:
+            return jsonify({"ok": False, "error": error}), 400
         if not fields:
             return jsonify({"ok": False, "error": "no_fields"}), 400
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        params.append(user_id)
-        cur.execute(f"UPDATE users SET {', '.join(fields)} WHERE id=%s", tuple(params))
+        params = [v for column in ADMIN_USER_COLUMNS for v in (column in fields, fields.get(column))]
+        cur.execute(SQL_ADMIN_UPDATE_USER, (*params, user_id))
         conn.commit()
+        bump_version("users")
         return jsonify({"ok": True})
 
+    @app.put("/api/admin/users/bulk")
+    def admin_bulk_update_users():
+        """
+        Applies [{id, role, blocked, ...}, ...] edits in a single UPDATE, one
+        CASE id WHEN ... per touched column.
+        """
+        if g.current_user["role"] != "admin":
+            return jsonify({"ok": False, "error": "forbidden"}), 403
+        items = request.get_json(silent=True)
+        if not isinstance(items, list) or not items:
+            return jsonify({"ok": False, "error": "invalid_users"}), 400
+        updates: Dict[int, Dict[str, Any]] = {}
+        for item in items:
+            try:
+                uid = int(item.get("id"))
+            except Exception:
+                return jsonify({"ok": False, "error": "invalid_users"}), 400
+            fields, error = admin_user_fields(item)
+            if error:
+                return jsonify({"ok": False, "error": error}), 400
+            updates.setdefault(uid, {}).update(fields)
+        sets = []
+        params: List[Any] = []
+        for column in ADMIN_USER_COLUMNS:
+            pairs = [(uid, fields[column]) for uid, fields in updates.items() if column in fields]
+            if pairs:
+                sets.append(f"{column} = CASE id {' '.join(['WHEN %s THEN %s'] * len(pairs))} ELSE {column} END")
+                params.extend(v for pair in pairs for v in pair)
+        if not sets:
+            return jsonify({"ok": False, "error": "no_fields"}), 400
+        conn = get_db()
+        if conn is None:
+            return jsonify({"ok": False, "error": "db_unavailable"}), 503
+        placeholders = ", ".join(["%s"] * len(updates))
+        params.extend(updates.keys())
+        cur = conn.cursor()
+        cur.execute(f"UPDATE users SET {', '.join(sets)} WHERE id IN ({placeholders})", tuple(params))
+        conn.commit()
+        bump_version("users")
+        return jsonify({"ok": True, "updated": cur.rowcount})
+
     @app.get("/api/profile")
     def get_profile():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         conn = get_db()
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT id, username, display_name, avatar_url, email FROM users WHERE id=%s", (int(session["user_id"]),))
+        cur.execute(SQL_GET_PROFILE, (g.current_user["id"],))
         row = cur.fetchone()
-        return jsonify({"ok": True, "user": row})
+        return cached_json({"ok": True, "user": row})
 
     @app.put("/api/profile")
     def update_profile():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
         display_name = str(payload.get("display_name", "")).strip() or None
@@ -512,20 +830,21 @@ def create_app() -> Flask:
         cur = conn.cursor()
         # Role changes only allowed for admin
         if new_role is not None:
-            if (session.get("role") != "admin"):
+            if g.current_user["role"] != "admin":
                 return jsonify({"ok": False, "error": "forbidden"}), 403
             nr = str(new_role).lower()
             if nr not in ("user", "admin"):
                 return jsonify({"ok": False, "error": "invalid_role"}), 400
-            cur.execute("UPDATE users SET display_name=%s, avatar_url=%s, role=%s WHERE id=%s", (display_name, avatar_url, nr, int(session["user_id"])) )
+            cur.execute(SQL_UPDATE_PROFILE_ROLE, (display_name, avatar_url, nr, g.current_user["id"]) )
         else:
-            cur.execute("UPDATE users SET display_name=%s, avatar_url=%s WHERE id=%s", (display_name, avatar_url, int(session["user_id"])) )
+            cur.execute(SQL_UPDATE_PROFILE, (display_name, avatar_url, g.current_user["id"]) )
         conn.commit()
+        bump_version("users")
         return jsonify({"ok": True})
 
     @app.put("/api/auth/password")
     def change_password():
-        if not session.get("user_id"):
+        if not g.current_user["id"]:
             return jsonify({"ok": False, "error": "unauthorized"}), 401
         payload = request.get_json(silent=True) or {}
         current = str(payload.get("current", ""))
@@ -536,11 +855,11 @@ def create_app() -> Flask:
         if conn is None:
             return jsonify({"ok": False, "error": "db_unavailable"}), 503
         cur = conn.cursor()
-        cur.execute("SELECT password_hash FROM users WHERE id=%s", (int(session["user_id"]),))
+        cur.execute(SQL_GET_PASSWORD_HASH, (g.current_user["id"],))
         row = cur.fetchone()
-        if not row or not check_password_hash(row.get("password_hash"), current):
+        if not row or not HASH_POOL.submit(verify_password, row.get("password_hash"), current).result()[0]:
             return jsonify({"ok": False, "error": "invalid_current"}), 400
-        cur.execute("UPDATE users SET password_hash=%s WHERE id=%s", (generate_password_hash(new), int(session["user_id"])) )
+        cur.execute(SQL_SET_PASSWORD_HASH, (HASH_POOL.submit(hash_password, new).result(), g.current_user["id"]) )
         conn.commit()
         return jsonify({"ok": True})
 
@@ -560,62 +879,240 @@ def mysql_config() -> Dict[str, Any]:
     }
 
 
-def connect_mysql(create_db_if_missing: bool = False) -> Optional[Any]:
+def fetch_one(cur: Any, column: str) -> Any:
+    """
+    Returns one column of the next row, or None when there is no row.
+    """
+    row = cur.fetchone()
+    return row[column] if row else None
+
+
+def connector_connection(conn: Any) -> Any:
+    """
+    Prepares a mysql.connector connection like the PyMySQL ones: runs
+    SQL_SESSION_INIT (which PyMySQL gets via init_command/setsession) and wraps
+    it for dict rows.
+    """
+    cur = conn.cursor()
+    cur.execute(SQL_SESSION_INIT)
+    cur.close()
+    return migrate.DictRowConnection(conn)
+
+
+def connect_mysql() -> Optional[Any]:
     cfg = mysql_config()
     try:
         import pymysql  # type: ignore
-        try:
-            return pymysql.connect(
-                host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                cursorclass=pymysql.cursors.DictCursor,
-            )
-        except Exception:
-            if create_db_if_missing:
-                tmp = pymysql.connect(
-                    host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"],
-                    cursorclass=pymysql.cursors.DictCursor,
-                )
-                cur = tmp.cursor()
-                cur.execute(f"CREATE DATABASE IF NOT EXISTS `{cfg['database']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-                tmp.commit()
-                tmp.close()
-                return pymysql.connect(
-                    host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                    cursorclass=pymysql.cursors.DictCursor,
-                )
+        return pymysql.connect(
+            host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
+            cursorclass=pymysql.cursors.DictCursor, init_command=SQL_SESSION_INIT,
+        )
     except Exception:
         pass
     try:
         import mysql.connector  # type: ignore
-        try:
-            return mysql.connector.connect(
-                host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-            )
-        except Exception:
-            if create_db_if_missing:
-                tmp = mysql.connector.connect(
-                    host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"],
-                )
-                cur = tmp.cursor()
-                cur.execute(f"CREATE DATABASE IF NOT EXISTS `{cfg['database']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-                tmp.commit()
-                tmp.close()
-                return mysql.connector.connect(
-                    host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                )
+        return connector_connection(mysql.connector.connect(
+            host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
+        ))
     except Exception:
         pass
     return None
 
 
+_POOL: Optional[Any] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> Optional[Any]:
+    """
+    Returns the process-wide PyMySQL connection pool, creating it on first use.
+    Sized by DB_POOL_MIN (idle connections opened up front), DB_POOL_MAX_IDLE
+    and DB_POOL_SIZE (hard cap; callers block when it is reached).
+    Returns None when DBUtils/PyMySQL are missing or MySQL is unreachable so
+    callers can fall back to a direct connection.
+    """
+    global _POOL
+    if _POOL is not None:
+        return _POOL
+    try:
+        import pymysql  # type: ignore
+        from dbutils.pooled_db import PooledDB  # type: ignore
+    except Exception:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            cfg = mysql_config()
+            try:
+                _POOL = PooledDB(
+                    creator=pymysql,
+                    mincached=int(os.environ.get("DB_POOL_MIN", "4")),
+                    maxcached=int(os.environ.get("DB_POOL_MAX_IDLE", "16")),
+                    maxconnections=int(os.environ.get("DB_POOL_SIZE", "32")),
+                    blocking=True, ping=1, setsession=[SQL_SESSION_INIT],
+                    host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
+                    cursorclass=pymysql.cursors.DictCursor,
+                )
+            except Exception:
+                return None
+    return _POOL
+
+
 def get_db() -> Optional[Any]:
-    if hasattr(g, "db_conn") and g.db_conn is not None:
-        return g.db_conn
-    conn = connect_mysql(True)
+    conn = g.get("db_conn")
+    if conn is not None:
+        return conn
+    pool = get_pool()
+    if pool is not None:
+        try:
+            conn = pool.connection()
+        except Exception:
+            conn = None
+    else:
+        conn = connect_mysql()
     if conn is not None:
+        check_schema(conn)
         g.db_conn = conn
     return conn
 
+def cached_json(payload: Dict[str, Any]) -> Response:
+    """
+    JSON response carrying an ETag so repeat requests can be answered with
+    304 Not Modified. The browser revalidates every time, since the UI
+    refetches this data right after editing it. Private and varied on the
+    session cookie.
+    """
+    response = jsonify(payload)
+    response.set_etag(hashlib.blake2b(response.get_data(), digest_size=8).hexdigest())
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response.make_conditional(request)
+
+
+ADMIN_USER_COLUMNS = ("display_name", "avatar_url", "email", "role", "blocked")
+
+
+def admin_user_fields(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Picks the admin-editable user columns out of a payload, normalised for the
+    UPDATE. Returns (fields, error code or None).
+    """
+    fields: Dict[str, Any] = {}
+    for column in ("display_name", "avatar_url", "email"):
+        if column in payload:
+            fields[column] = str(payload[column])
+    if "role" in payload:
+        r = str(payload["role"]).lower()
+        if r not in ("customer", "user", "admin"):
+            return {}, "invalid_role"
+        fields["role"] = r
+    if "blocked" in payload:
+        fields["blocked"] = 1 if bool(payload["blocked"]) else 0
+    return fields, None
+
+
+def stream_cursor(conn: Any, dict_rows: bool = True) -> Any:
+    """
+    Returns an unbuffered (server-side) cursor for large result sets, yielding
+    dicts or plain tuples, or a regular cursor on the mysql.connector fallback.
+    """
+    if isinstance(conn, migrate.DictRowConnection):
+        return conn.cursor(dictionary=dict_rows)
+    import pymysql  # type: ignore
+    return conn.cursor(pymysql.cursors.SSDictCursor if dict_rows else pymysql.cursors.SSCursor)
+
+
+def page_args() -> Tuple[str, list]:
+    """
+    Builds a LIMIT/OFFSET clause from the ?limit= and ?offset= query args.
+    Returns an empty clause when no limit is requested.
+    """
+    limit = request.args.get("limit", type=int)
+    if limit is None or limit < 0:
+        return "", []
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    return " LIMIT %s OFFSET %s", [limit, offset]
+
+
+def json_bytes(obj: Any) -> bytes:
+    """
+    Encodes obj with the app's JSON provider straight to bytes (orjson when available).
+    """
+    dumps_bytes = getattr(current_app.json, "dumps_bytes", None)
+    return dumps_bytes(obj) if dumps_bytes else current_app.json.dumps(obj).encode()
+
+
+def stream_columns(cur: Any, batch_size: int = 200) -> Response:
+    """
+    Streams an executed tuple cursor in columnar form,
+    {"ok":true,"columns":[...],"rows":[[...],...]}, so no per-row dict is
+    built on the way out and column names are sent once.
+    """
+    columns = [d[0] for d in cur.description]
+
+    def generate():
+        try:
+            yield b'{"ok":true,"columns":' + json_bytes(columns) + b',"rows":['
+            sep = b""
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                # One encoder call per batch: the rows list encodes as "[r1,r2,...]"; drop its brackets
+                yield sep + json_bytes(rows)[1:-1]
+                sep = b","
+            yield b"]}"
+        finally:
+            cur.close()
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+# Short-lived cache of encoded read results, e.g. the admin user list the UI refetches.
+# Keys include a per-table version that writers bump, so this process never serves
+# data older than its own last write; other workers catch up within the TTL.
+QUERY_CACHE = TTLCache(maxsize=256, ttl=5)
+TABLE_VERSIONS: Dict[str, int] = {"users": 0}
+_QUERY_CACHE_LOCK = threading.Lock()
+_PENDING_FILLS: Dict[tuple, threading.Lock] = {}
+
+
+def bump_version(table: str) -> None:
+    with _QUERY_CACHE_LOCK:
+        TABLE_VERSIONS[table] += 1
+
+
+def cached_result(key: tuple, fill: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+    """
+    Returns QUERY_CACHE[key], computing it with fill() on a miss. Concurrent
+    misses on one key wait for the first caller's fill instead of all querying.
+    A None result (e.g. database unavailable) is returned but not cached.
+    """
+    with _QUERY_CACHE_LOCK:
+        body = QUERY_CACHE.get(key)
+        if body is not None:
+            return body
+        pending = _PENDING_FILLS.setdefault(key, threading.Lock())
+    try:
+        with pending:
+            with _QUERY_CACHE_LOCK:
+                body = QUERY_CACHE.get(key)
+            if body is None:
+                body = fill()
+                if body is not None:
+                    with _QUERY_CACHE_LOCK:
+                        QUERY_CACHE[key] = body
+    finally:
+        with _QUERY_CACHE_LOCK:
+            _PENDING_FILLS.pop(key, None)
+    return body
+
+
+MAIL_WORKERS = 8
+# Messages per SMTP connection in the send-reminders batch job
+REMINDER_BATCH_SIZE = 50
+MAIL_POOL = ThreadPoolExecutor(max_workers=MAIL_WORKERS)
+
+
 def smtp_config() -> Dict[str, Any]:
     return {
         "host": os.environ.get("SMTP_HOST", ""),
@@ -625,108 +1122,89 @@ def smtp_config() -> Dict[str, Any]:
         "from_email": os.environ.get("FROM_EMAIL", ""),
     }
 
+def smtp_configured(cfg: Dict[str, Any]) -> bool:
+    return bool(cfg["host"] and cfg["from_email"])
+
+
 def send_email(to_email: str, subject: str, body: str) -> None:
+    send_emails_bulk([(to_email, subject, body)])
+
+
+def send_emails_bulk(messages: List[Tuple[str, str, str]]) -> None:
+    """
+    Sends (to_email, subject, body) messages over a single SMTP connection so
+    the connect/STARTTLS/login handshake is paid once for the whole batch.
+    """
     cfg = smtp_config()
-    if not cfg["host"] or not cfg["from_email"]:
+    if not smtp_configured(cfg):
         raise RuntimeError("smtp_not_configured")
     import smtplib
     from email.message import EmailMessage
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = cfg["from_email"]
-    msg["To"] = to_email
-    msg.set_content(body)
     with smtplib.SMTP(cfg["host"], cfg["port"]) as server:
         server.starttls()
         if cfg["user"]:
             server.login(cfg["user"], cfg["password"])
-        server.send_message(msg)
+        for to_email, subject, body in messages:
+            msg = EmailMessage()
+            msg["Subject"] = subject
+            msg["From"] = cfg["from_email"]
+            msg["To"] = to_email
+            msg.set_content(body)
+            server.send_message(msg)
+
 
+def reminder_digest(email: str, body: str, count: int) -> Tuple[str, str, str]:
+    subject = "Task Reminder" if count == 1 else f"{count} Task Reminders"
+    return email, subject, f"Due soon:\n{body}"
 
-def ensure_schema(conn: Any) -> None:
+
+def bootstrap_db() -> bool:
     """
-    Creates required tables if they do not exist.
+    Creates the database if missing and applies pending migrations (migrate.py).
+    Returns False when MySQL could not be reached.
     """
-    cur = conn.cursor()
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS users (
-          id INT AUTO_INCREMENT PRIMARY KEY,
-          username VARCHAR(64) NOT NULL UNIQUE,
-          email VARCHAR(255) UNIQUE,
-          password_hash VARCHAR(255) NOT NULL,
-          role ENUM('user','admin','customer') NOT NULL DEFAULT 'customer',
-          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """
-    )
-    # Ensure 'role' column exists (compatible with MySQL versions lacking IF NOT EXISTS for columns)
+    return migrate.main()
+
+
+_SCHEMA_READY = False
+
+
+def check_schema(conn: Any) -> None:
+    """
+    Once per process, warns if the newest migration has not been applied. The
+    app itself never runs DDL; the schema is owned by migrate.py.
+    """
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
     try:
-        cur.execute("SELECT DATABASE()")
-        db_row = cur.fetchone()
-        db_name = db_row.get("DATABASE()") if isinstance(db_row, dict) else db_row[0]
-        cur.execute(
-            "SELECT COUNT(*) AS cnt FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA=%s AND TABLE_NAME='users' AND COLUMN_NAME='role'",
-            (db_name,),
-        )
-        cnt_row = cur.fetchone() or {"cnt": 0}
-        cnt = cnt_row.get("cnt") if isinstance(cnt_row, dict) else cnt_row[0]
-        if not cnt:
-            cur.execute("ALTER TABLE users ADD COLUMN role ENUM('user','admin','customer') NOT NULL DEFAULT 'customer' AFTER password_hash")
-        else:
-            # Ensure enum includes 'customer'
-            try:
-                cur.execute("ALTER TABLE users MODIFY COLUMN role ENUM('user','admin','customer') NOT NULL DEFAULT 'customer'")
-            except Exception:
-                pass
+        cur = conn.cursor()
+        cur.execute(SQL_SCHEMA_READY, (migrate.load_migrations()[-1][0],))
+        applied = cur.fetchone()
+        cur.close()
     except Exception:
-        pass
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS tasks (
-          id INT AUTO_INCREMENT PRIMARY KEY,
-          user_id INT NOT NULL,
-          text VARCHAR(512) NOT NULL,
-          completed TINYINT(1) NOT NULL DEFAULT 0,
-          position INT DEFAULT 0,
-          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-          updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-          INDEX idx_tasks_user (user_id),
-          FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """
-    )
-    cur.execute(
-        """
-        CREATE TABLE IF NOT EXISTS subtasks (
-          id INT AUTO_INCREMENT PRIMARY KEY,
-          task_id INT NOT NULL,
-          text VARCHAR(512) NOT NULL,
-          completed TINYINT(1) NOT NULL DEFAULT 0,
-          position INT DEFAULT 0,
-          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-          updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-          INDEX idx_subtasks_task (task_id),
-          FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-        """
-    )
-    conn.commit()
+        applied = None
+    _SCHEMA_READY = True
+    if not applied:
+        current_app.logger.warning("Database schema is out of date; run `python migrate.py`.")
 
 
 def close_db(exception: Optional[BaseException]) -> None:
     """
-    Closes the database connection after each request.
+    Releases the request's database connection. Pooled connections are only
+    handed back to the pool here; the underlying socket stays open for reuse.
     """
-    conn = getattr(g, "db_conn", None)
+    conn = g.pop("db_conn", None)
     if conn is not None:
         try:
             conn.close()
         except Exception:
+            # Direct (unpooled) connection that was already closed or broken
             pass
 
 
 if __name__ == "__main__":
+    bootstrap_db()
     app = create_app()
     app.run(host="127.0.0.1", port=5000, debug=True)
     @app.post("/api/reminders/send")
@@ -1,8 +1,8 @@
 import os
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 
 from pathlib import Path
-from werkzeug.security import generate_password_hash
+from argon2 import PasswordHasher
 
 
 def mysql_config():
@@ -15,6 +15,31 @@ def mysql_config():
     }
 
 
+def password_hasher() -> PasswordHasher:
+    """
+    The app's argon2id parameters, shared with main.py so seeded hashes follow
+    the same rehash policy. Lower ARGON2_MEMORY_COST (KiB) on memory-constrained hosts.
+    """
+    return PasswordHasher(time_cost=2, memory_cost=int(os.environ.get("ARGON2_MEMORY_COST", "19456")), parallelism=1)
+
+
+class DictRowConnection:
+    """
+    Wraps a mysql.connector connection so cursor() yields dict rows, the same
+    shape as PyMySQL's DictCursor; callers never branch on the row type.
+    Shared with main.py.
+    """
+
+    def __init__(self, conn: Any) -> None:
+        self._conn = conn
+
+    def cursor(self, dictionary: bool = True, **kwargs: Any) -> Any:
+        return self._conn.cursor(dictionary=dictionary, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
 def connect_mysql(create_db_if_missing: bool = False) -> Optional[Any]:
     cfg = mysql_config()
     try:
@@ -22,7 +47,7 @@ def connect_mysql(create_db_if_missing: bool = False) -> Optional[Any]:
         try:
             return pymysql.connect(
                 host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                cursorclass=pymysql.cursors.DictCursor,
+                cursorclass=pymysql.cursors.DictCursor, client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
             )
         except Exception:
             if create_db_if_missing:
@@ -36,16 +61,16 @@ def connect_mysql(create_db_if_missing: bool = False) -> Optional[Any]:
                 tmp.close()
                 return pymysql.connect(
                     host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                    cursorclass=pymysql.cursors.DictCursor,
+                    cursorclass=pymysql.cursors.DictCursor, client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS,
                 )
     except Exception:
         pass
     try:
         import mysql.connector
         try:
-            return mysql.connector.connect(
+            return DictRowConnection(mysql.connector.connect(
                 host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-            )
+            ))
         except Exception:
             if create_db_if_missing:
                 tmp = mysql.connector.connect(
@@ -55,56 +80,95 @@ def connect_mysql(create_db_if_missing: bool = False) -> Optional[Any]:
                 cur.execute(f"CREATE DATABASE IF NOT EXISTS `{cfg['database']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
                 tmp.commit()
                 tmp.close()
-                return mysql.connector.connect(
+                return DictRowConnection(mysql.connector.connect(
                     host=cfg["host"], port=cfg["port"], user=cfg["user"], password=cfg["password"], database=cfg["database"],
-                )
+                ))
     except Exception:
         pass
     return None
 
 
-def load_migrations() -> List[Path]:
+_MIGRATIONS: Optional[List[Tuple[str, List[str]]]] = None
+
+
+def load_migrations() -> List[Tuple[str, List[str]]]:
+    """
+    Loads migration files as (name, statements) sorted by name, in one directory
+    scan; each file is read and split on ';' once per process.
+    """
+    global _MIGRATIONS
+    if _MIGRATIONS is None:
+        root = Path(__file__).parent / "migrations"
+        with os.scandir(root) as it:
+            entries = sorted((e for e in it if e.is_file() and e.name.endswith(".sql")), key=lambda e: e.name)
+        _MIGRATIONS = []
+        for entry in entries:
+            with open(entry.path, encoding="utf-8") as f:
+                sql = f.read()
+            _MIGRATIONS.append((entry.name, [s.strip() for s in sql.split(";") if s.strip()]))
+    return _MIGRATIONS
+
+
+def applied_migrations(cur) -> set:
     """
-    Loads migration SQL files sorted by name.
+    Returns the names recorded in schema_migrations, in one query.
     """
-    root = Path(__file__).parent / "migrations"
-    return sorted([p for p in root.glob("*.sql")])
+    try:
+        cur.execute("SELECT name FROM schema_migrations")
+        return {row["name"] for row in cur.fetchall()}
+    except Exception:
+        return set()
 
 
-def already_applied(cur, name: str) -> bool:
+def supports_multi_statements(conn) -> bool:
     """
-    Checks if a migration name exists in schema_migrations.
+    True when the connection was opened with CLIENT.MULTI_STATEMENTS (PyMySQL).
     """
     try:
-        cur.execute("SELECT 1 FROM schema_migrations WHERE name=%s", (name,))
-        return bool(cur.fetchone())
+        import pymysql
+        return bool(getattr(conn, "client_flag", 0) & pymysql.constants.CLIENT.MULTI_STATEMENTS)
     except Exception:
         return False
 
 
-def apply_migration(conn, path: Path) -> None:
+def apply_migration(conn, name: str, stmts: List[str]) -> None:
     """
-    Applies a single .sql migration file and records it in schema_migrations.
+    Applies a single migration's statements and records it in schema_migrations.
     """
     cur = conn.cursor()
-    sql = path.read_text(encoding="utf-8")
-    for stmt in [s.strip() for s in sql.split(";") if s.strip()]:
+    if not supports_multi_statements(conn):
+        for stmt in stmts:
+            try:
+                cur.execute(stmt)
+            except Exception as e:
+                print(f"Warning: failed statement in {name}: {stmt[:80]}... ({e})")
+        stmts = []
+    # Send the whole file in one round trip. The server stops at the first failing
+    # statement, so warn about it and resend whatever came after it.
+    while stmts:
+        done = 0
         try:
-            cur.execute(stmt)
+            cur.execute(";\n".join(stmts))
+            done = 1
+            while cur.nextset():
+                done += 1
+            break
         except Exception as e:
-            print(f"Warning: failed statement in {path.name}: {stmt[:80]}... ({e})")
-    cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (path.name,))
+            print(f"Warning: failed statement in {name}: {stmts[done][:80]}... ({e})")
+            stmts = stmts[done + 1:]
+    cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
     conn.commit()
 
 
-def main():
+def main() -> bool:
     """
     Migration runner: ensures schema_migrations table, then applies pending files.
+    Returns False when the database could not be reached.
     """
     conn = connect_mysql(True)
     if conn is None:
         print("Database connection failed. Check env and drivers.")
-        return
+        return False
     cur = conn.cursor()
     cur.execute(
         """
@@ -117,35 +181,31 @@ def main():
     )
     conn.commit()
 
-    for path in load_migrations():
-        if already_applied(cur, path.name):
-            print(f"Skipping {path.name} (already applied)")
+    applied = applied_migrations(cur)
+    for name, stmts in load_migrations():
+        if name in applied:
+            print(f"Skipping {name} (already applied)")
             continue
-        print(f"Applying {path.name}…")
-        apply_migration(conn, path)
+        print(f"Applying {name}…")
+        apply_migration(conn, name, stmts)
     print("Migrations complete.")
 
-    # Ensure admin user exists
+    # Ensure admin user exists (hashed only when it is missing)
     try:
         cur.execute("SELECT id FROM users WHERE username=%s", ("admin",))
-        exists = cur.fetchone()
-        if not exists:
+        if not cur.fetchone():
             admin_password = os.environ.get("ADMIN_PASSWORD", "admin@123")
-            admin_hash = generate_password_hash(admin_password)
-            try:
-                cur.execute(
-                    "INSERT INTO users (username, email, password_hash, role) VALUES (%s, %s, %s, %s)",
-                    ("admin", "admin@example.com", admin_hash, "admin"),
-                )
-            except Exception:
-                cur.execute(
-                    "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-                    ("admin", "admin@example.com", admin_hash),
-                )
+            admin_hash = password_hasher().hash(admin_password)
+            cur.execute(
+                "INSERT INTO users (username, email, password_hash, role) VALUES (%s, %s, %s, 'admin')",
+                ("admin", "admin@example.com", admin_hash),
+            )
             conn.commit()
             print("Admin user created: username=admin (use ADMIN_PASSWORD env to override default)")
     except Exception as e:
         print(f"Warning: failed to ensure admin user: {e}")
+    conn.close()
+    return True
 
 
 if __name__ == "__main__":
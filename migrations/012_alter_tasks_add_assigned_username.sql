@@ -0,0 +1,3 @@
+ALTER TABLE tasks
+  ADD COLUMN assigned_username VARCHAR(64) NULL AFTER assigned_to;
+UPDATE tasks t JOIN users u ON t.assigned_to = u.id SET t.assigned_username = u.username;
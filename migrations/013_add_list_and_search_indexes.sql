@@ -0,0 +1,6 @@
+CREATE INDEX idx_tasks_user_pos ON tasks (user_id, position, id);
+CREATE INDEX idx_tasks_assigned_pos ON tasks (assigned_to, position);
+CREATE INDEX idx_tasks_user_completed_upd ON tasks (user_id, completed, updated_at);
+CREATE INDEX idx_subtasks_task_pos ON subtasks (task_id, position, id);
+CREATE FULLTEXT INDEX idx_tasks_ft ON tasks (text, description, category);
+CREATE FULLTEXT INDEX idx_users_ft ON users (username, email);
@@ -0,0 +1 @@
+CREATE INDEX idx_tasks_remind ON tasks (user_id, remind, completed, due_date);
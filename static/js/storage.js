@@ -40,7 +40,9 @@ async function apiGetTasks(sort = 'position', q = '') {
   const res = await fetch(`/api/tasks?sort=${encodeURIComponent(sort)}${query}`);
   const data = await res.json();
   if (!res.ok || !data.ok) throw new Error(data.error || 'Failed to fetch tasks');
-  return data.data || [];
+  // Columnar payload: {columns:[...], rows:[[...], ...]} -> array of task objects
+  const cols = data.columns || [];
+  return (data.rows || []).map((row) => Object.fromEntries(cols.map((c, i) => [c, row[i]])));
 }
 
 /**